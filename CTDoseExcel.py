@@ -5,77 +5,144 @@ Este script lê os arquivos JSON gerados pelo CTDoseExtractor e cria
 uma planilha Excel com as informações organizadas em colunas.
 """
 
+import contextlib
+import csv
+import functools
 import json
+import mmap
 import os
-import glob
-import argparse
 import re
+import glob
+import io
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from xml.sax.saxutils import escape as xml_escape
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-
-
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+from openpyxl.utils import get_column_letter
+
+try:
+    # O ijson escolhe sozinho o backend mais rápido disponível (yajl2_c, quando compilado)
+    import ijson
+    _JSON_STREAM_ERRORS = (ijson.JSONError,)
+except ImportError:
+    ijson = None
+    _JSON_STREAM_ERRORS = ()
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+try:
+    # Parser em C, bem mais rápido que o json da biblioteca padrão para o arquivo inteiro
+    import orjson
+except ImportError:
+    orjson = None
+
+
+SHEET_TITLE = "Relatórios CT"
+
+# Colunas da planilha: (cabeçalho, largura), na ordem das tuplas de iter_report_rows
+_COLUMNS = (
+    ("ID do paciente", 15),
+    ("Nome do paciente", 25),
+    ("Sexo", 10),
+    ("Data de nascimento", 18),
+    ("Idade", 10),
+    ("Pesquisa de interesse", 20),
+    ("Data do exame", 18),
+    ("Descrição da série", 20),
+    ("Scan mode", 15),
+    ("mAs", 10),
+    ("kV", 10),
+    ("CTDIvol", 10),
+    ("DLP", 10),
+    ("DLP total", 10),
+    ("Phantom type", 15),
+    ("SSDE", 10),
+    ("Avg scan size", 15),
+)
+_HEADERS = tuple(header for header, _ in _COLUMNS)
+_COLUMN_WIDTHS = tuple(width for _, width in _COLUMNS)
+
+
+def _find_year(text):
+    """
+    Retorna o primeiro ano (4 dígitos seguidos) do texto, ou None.
+
+    Usado como fallback quando a data não bate com nenhum formato; uma
+    varredura simples caractere a caractere, sem passar pelo motor de regex.
+    """
+    for i in range(len(text) - 3):
+        if '0' <= text[i] <= '9':
+            chunk = text[i:i + 4]
+            if chunk.isascii() and chunk.isdigit():
+                return int(chunk)
+    return None
+
+
+# Formatos comuns da data de nascimento
+_BIRTH_FORMATS = (
+    '%b %d, %Y',
+    '%B %d, %Y',
+    '%Y-%m-%d',
+    '%d/%m/%Y',
+    '%m/%d/%Y',
+)
+
+# Formatos comuns da data do exame
+_EXAM_FORMATS = (
+    '%b %d, %Y, %I:%M:%S %p',  # "May 5, 2025, 1:20:41 PM"
+    '%B %d, %Y, %I:%M:%S %p',  # "May 5, 2025, 1:20:41 PM"
+    '%b %d, %Y',  # "May 5, 2025"
+    '%B %d, %Y',  # "May 5, 2025"
+    '%Y-%m-%d',  # "2025-05-05"
+    '%d/%m/%Y',  # "05/05/2025"
+    '%m/%d/%Y',  # "05/05/2025"
+)
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_date(date_str, formats, fallback_month, fallback_day):
+    """
+    Converte o texto da data em datetime, uma única vez por texto distinto.
+
+    Se nenhum formato servir, usa apenas o ano com o mês/dia de aproximação
+    informados. Retorna None se não houver nem o ano.
+    """
+    stripped = date_str.strip()
+    for fmt in formats:
+        try:
+            return datetime.strptime(stripped, fmt)
+        except ValueError:
+            continue
+
+    # Se não conseguiu fazer parse, tenta extrair apenas o ano (fallback)
+    year = _find_year(date_str)
+    if year is None:
+        return None
+    return datetime(year, fallback_month, fallback_day)
+
+
+@functools.lru_cache(maxsize=4096)
 def calculate_age(birth_date_str, exam_date_str):
     """Calcula a idade do paciente na época do exame."""
     if not birth_date_str or not exam_date_str:
         return '-'
 
     try:
-        # Tenta parsing com diferentes formatos de data
-        birth_date = None
-        exam_date = None
-
-        # Parsing da data de nascimento - formatos comuns
-        birth_formats = [
-            '%b %d, %Y',
-            '%B %d, %Y',
-            '%Y-%m-%d',
-            '%d/%m/%Y',
-            '%m/%d/%Y',
-        ]
-
-        for fmt in birth_formats:
-            try:
-                birth_date = datetime.strptime(birth_date_str.strip(), fmt)
-                break
-            except ValueError:
-                continue
-
+        # 1º de janeiro como aproximação quando só há o ano de nascimento
+        birth_date = _parse_date(birth_date_str, _BIRTH_FORMATS, 1, 1)
         if not birth_date:
-            # Se não conseguiu fazer parse, tenta extrair apenas o ano (fallback)
-            birth_year_match = re.search(r'(\d{4})', birth_date_str)
-            if birth_year_match:
-                birth_year = int(birth_year_match.group(1))
-                birth_date = datetime(birth_year, 1, 1)  # 1º de janeiro como aproximação
-            else:
-                return '-'
-
-        # Parsing da data do exame - formatos comuns
-        exam_formats = [
-            '%b %d, %Y, %I:%M:%S %p',  # "May 5, 2025, 1:20:41 PM"
-            '%B %d, %Y, %I:%M:%S %p',  # "May 5, 2025, 1:20:41 PM"
-            '%b %d, %Y',  # "May 5, 2025"
-            '%B %d, %Y',  # "May 5, 2025"
-            '%Y-%m-%d',  # "2025-05-05"
-            '%d/%m/%Y',  # "05/05/2025"
-            '%m/%d/%Y',  # "05/05/2025"
-        ]
-
-        for fmt in exam_formats:
-            try:
-                exam_date = datetime.strptime(exam_date_str.strip(), fmt)
-                break
-            except ValueError:
-                continue
+            return '-'
 
+        # Meio do ano como aproximação quando só há o ano do exame
+        exam_date = _parse_date(exam_date_str, _EXAM_FORMATS, 6, 15)
         if not exam_date:
-            # Se não conseguiu fazer parse, tenta extrair apenas o ano (fallback)
-            exam_year_match = re.search(r'(\d{4})', exam_date_str)
-            if exam_year_match:
-                exam_year = int(exam_year_match.group(1))
-                exam_date = datetime(exam_year, 6, 15)  # Meio do ano como aproximação
-            else:
-                return '-'
+            return '-'
 
         age = exam_date.year - birth_date.year
 
@@ -87,72 +154,454 @@ def calculate_age(birth_date_str, exam_date_str):
 
     except Exception as e:
         # Em caso de erro, tenta o cálculo simples por ano
-        birth_year_match = re.search(r'(\d{4})', birth_date_str)
-        exam_year_match = re.search(r'(\d{4})', exam_date_str)
+        birth_year = _find_year(birth_date_str)
+        exam_year = _find_year(exam_date_str)
 
-        if birth_year_match and exam_year_match:
-            birth_year = int(birth_year_match.group(1))
-            exam_year = int(exam_year_match.group(1))
+        if birth_year is not None and exam_year is not None:
             age = exam_year - birth_year
             return str(age)
 
         return '-'
 
 
+def _norm(value):
+    """Substitui valores vazios (None, '' ou 'null') por '-'"""
+    return '-' if value is None or value == '' or value == 'null' else value
+
+
+def _norm_str(value):
+    """Como _norm, mas também trata textos só com espaços como vazios"""
+    if value is None or (isinstance(value, str) and (not value.strip() or value == 'null')):
+        return '-'
+    return value
+
+
+# Campos de série normalizados com _norm, na ordem dos valores lidos em extract_scan_info
+_SCAN_FIELDS = ('protocol', 'scan_mode', 'phantom_type', 'ctdivol', 'dlp', 'ssde', 'tube_current', 'kv')
+
+
 def extract_scan_info(acquisition):
     """Extrai informações de aquisição para cada linha, exatamente como estão no JSON"""
-    scan_info = {}
-
-    # Protocolo (será usado como Pesquisa de interesse)
-    scan_info['protocol'] = acquisition.get('protocol', '-')
+    ct_dose = acquisition.get('ct_dose') or {}  # Usa {} se for None
+    xray_params = acquisition.get('xray_source_params') or {}  # Usa {} se for None
+
+    # Valores exatos como estão no JSON, normalizados de uma vez só
+    scan_info = dict(zip(_SCAN_FIELDS, map(_norm, (
+        acquisition.get('protocol'),  # Protocolo (será usado como Pesquisa de interesse)
+        acquisition.get('acquisition_type'),  # Scan mode (tipo de aquisição)
+        ct_dose.get('phantom_type'),
+        ct_dose.get('mean_ctdivol'),
+        ct_dose.get('dlp'),
+        ct_dose.get('size_specific_dose'),
+        xray_params.get('tube_current'),
+        xray_params.get('kvp'),
+    ))))
 
     # Descrição da série (APENAS comment, sem fallback)
-    # Tratamento especial para comment (garantir que null se torne '-')
-    comment = acquisition.get('comment')
-    # Múltiplas verificações para garantir que qualquer valor "vazio" se torne '-'
-    if comment is None or comment == '' or (isinstance(comment, str) and comment.strip() == '') or comment == 'null':
-        scan_info['description'] = '-'
-    else:
-        scan_info['description'] = comment
+    # Qualquer valor "vazio" (null, '', só espaços, 'null') se torna '-'
+    scan_info['description'] = _norm_str(acquisition.get('comment'))
 
-    # Scan mode (tipo de aquisição)
-    scan_info['scan_mode'] = acquisition.get('acquisition_type', '-')
+    # Avg scan size - não está disponível geralmente
+    scan_info['avg_scan_size'] = '-'
 
-    # Phantom type
-    ct_dose = acquisition.get('ct_dose', {}) or {}  # Usa {} se for None
-    scan_info['phantom_type'] = ct_dose.get('phantom_type', '-')
+    return scan_info
 
-    # CTDI vol - valor exato como está no JSON
-    ctdivol = ct_dose.get('mean_ctdivol')
-    scan_info['ctdivol'] = ctdivol if ctdivol is not None else '-'
 
-    # DLP - valor exato como está no JSON
-    dlp = ct_dose.get('dlp')
-    scan_info['dlp'] = dlp if dlp is not None else '-'
+# Informações de série usadas na linha de um relatório sem aquisições
+_EMPTY_SCAN_INFO = {
+    'protocol': '-', 'description': '-', 'scan_mode': '-', 'phantom_type': '-', 'ctdivol': '-',
+    'dlp': '-', 'ssde': '-', 'tube_current': '-', 'kv': '-', 'avg_scan_size': '-',
+}
 
-    # SSDE - valor exato como está no JSON, com tratamento especial para None
-    ssde = ct_dose.get('size_specific_dose')
-    scan_info['ssde'] = ssde if ssde is not None else '-'
 
-    # Dados da fonte de raios X
-    xray_params = acquisition.get('xray_source_params', {}) or {}  # Usa {} se for None
+def iter_report_rows(reports):
+    """Gera uma tupla de valores (uma por coluna) para cada linha da planilha"""
+    for report in reports:
+        essential = report.get('essential', {})
 
-    # Tube current - valor exato como está no JSON
-    tube_current = xray_params.get('tube_current')
-    scan_info['tube_current'] = tube_current if tube_current is not None else '-'
+        # Obtém informações básicas do paciente/estudo
+        birth_date = essential.get('birth_date', '')
+        study_date = essential.get('study_date', '')
+        patient_id = _norm(essential.get('patient_id'))
+        patient_name = _norm(essential.get('patient_name'))
+        sex = _norm(essential.get('sex'))
 
-    # kV - valor exato como está no JSON
-    kv = xray_params.get('kvp')
-    scan_info['kv'] = kv if kv is not None else '-'
+        # Calcula a idade com base na data de nascimento e data do exame
+        # (uma vez por relatório, vale para todas as aquisições)
+        age = calculate_age(birth_date, study_date)
+        birth_date = _norm(birth_date)
+        study_date = _norm(study_date)
 
-    # Avg scan size - não está disponível geralmente
-    scan_info['avg_scan_size'] = '-'
+        # DLP total - direto do JSON, sem extração
+        irradiation = report.get('irradiation', {})
+        total_dlp = _norm(irradiation.get('total_dlp'))
 
-    return scan_info
+        # Processa cada aquisição/série como uma linha; se não houver aquisições,
+        # gera pelo menos uma linha com dados básicos (campos da série com '-')
+        acquisitions = report.get('acquisitions', [])
+        scan_infos = map(extract_scan_info, acquisitions) if acquisitions else (_EMPTY_SCAN_INFO,)
+
+        for scan_info in scan_infos:
+            yield (
+                patient_id,
+                patient_name,
+                sex,
+                birth_date,
+                age,
+                scan_info['protocol'],
+                study_date,
+                scan_info['description'],
+                scan_info['scan_mode'],
+                scan_info['tube_current'],
+                scan_info['kv'],
+                scan_info['ctdivol'],
+                scan_info['dlp'],
+                total_dlp,
+                scan_info['phantom_type'],
+                scan_info['ssde'],
+                scan_info['avg_scan_size'],
+            )
+
+
+def report_rows(report):
+    """Lista as linhas de um único relatório (unidade de trabalho do pool de processos)"""
+    return list(iter_report_rows((report,)))
+
+
+def _iter_report_rows_parallel(reports, workers):
+    """
+    Monta as linhas dos relatórios em paralelo com um pool de processos.
+
+    O map do executor mantém a ordem dos relatórios. Ele consome todos os
+    relatórios de uma vez, então não preserva a leitura em streaming.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for rows in executor.map(report_rows, reports, chunksize=64):
+            yield from rows
+
+
+@contextlib.contextmanager
+def _replace_on_success(output_file):
+    """
+    Entrega um caminho temporário na mesma pasta de output_file e só o move para
+    output_file se o bloco terminar sem erro (os.replace é atômico na mesma pasta).
+
+    Com a leitura em streaming, um JSON inválido só aparece durante a gravação;
+    assim o arquivo anterior não é sobrescrito por uma planilha pela metade.
+    """
+    directory, name = os.path.split(output_file)
+    temp_file = os.path.join(directory, f".{name}.tmp")
+    try:
+        yield temp_file
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temp_file)
+        raise
+    os.replace(temp_file, output_file)
+
+
+def _tee_csv(rows, headers, csv_file):
+    """Repassa as linhas adiante, gravando cada uma também no CSV (uma única passada)"""
+    writer = csv.writer(csv_file)
+    writer.writerow(headers)
+    for row in rows:
+        writer.writerow(row)
+        yield row
+
+
+def _write_csv(headers, column_widths, rows, output_file):
+    """Grava apenas o CSV (as larguras não se aplicam). Retorna o número de linhas de dados."""
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        return sum(1 for _ in _tee_csv(rows, headers, f))
+
+
+def _write_xlsx_openpyxl(headers, column_widths, rows, output_file):
+    """Grava a planilha com o openpyxl em modo write-only. Retorna o número de linhas de dados."""
+    # Cria uma nova planilha Excel em modo write-only (as linhas são gravadas
+    # em streaming, sem manter todas as células em memória)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(SHEET_TITLE)
+
+    # Estilos nomeados registrados uma única vez no workbook; as células só
+    # referenciam o nome, sem montar borda/fonte/preenchimento célula a célula
+    border = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+    wb.add_named_style(NamedStyle(
+        name="header",
+        font=Font(bold=True),
+        fill=PatternFill(start_color="D9D9D9", end_color="D9D9D9", fill_type="solid"),
+        alignment=Alignment(horizontal='center', vertical='center', wrap_text=True),
+        border=border,
+    ))
+    wb.add_named_style(NamedStyle(name="body", border=border))
+
+    # Define larguras das colunas (no modo write-only precisa ser antes do primeiro append)
+    for col_idx, width in enumerate(column_widths, 1):
+        ws.column_dimensions[get_column_letter(col_idx)].width = width
+
+    # Adiciona cabeçalhos na primeira linha
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.style = "header"
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    # Uma célula com estilo "body" por coluna, criada uma única vez e reaproveitada
+    # em todas as linhas (no modo write-only cada linha é gravada no append)
+    body_cells = []
+    for _ in headers:
+        cell = WriteOnlyCell(ws)
+        cell.style = "body"
+        body_cells.append(cell)
+
+    # Referências locais para o laço por linha (evita buscar atributos a cada linha)
+    append = ws.append
+    row_count = 0
+    try:
+        for values in rows:
+            for cell, value in zip(body_cells, values):
+                cell.value = value
+            append(body_cells)
+            row_count += 1
+    except BaseException:
+        # Uma planilha write-only abandonada no meio deixa o gerador de linhas do openpyxl aberto, que
+        # ao ser coletado ainda tenta gravar no temporário já fechado ("Exception ignored in ... _write_rows").
+        # Salvar o workbook em memória e descartar faz o próprio openpyxl fechar a planilha e apagar o temporário
+        with contextlib.suppress(Exception):
+            wb.save(io.BytesIO())
+        raise
+
+    wb.save(output_file)
+    return row_count
+
+
+def _write_xlsx_xlsxwriter(headers, column_widths, rows, output_file):
+    """
+    Grava a planilha com o xlsxwriter em modo constant_memory.
+
+    Nesse modo cada linha vai para um arquivo temporário assim que é escrita,
+    então a memória fica em uma linha. Retorna o número de linhas de dados.
+    """
+    wb = xlsxwriter.Workbook(output_file, {'constant_memory': True})
+    ws = wb.add_worksheet(SHEET_TITLE)
+
+    header_fmt = wb.add_format({
+        'bold': True, 'bg_color': '#D9D9D9', 'border': 1,
+        'align': 'center', 'valign': 'vcenter', 'text_wrap': True,
+    })
+    body_fmt = wb.add_format({'border': 1})
+
+    for col_idx, width in enumerate(column_widths):
+        ws.set_column(col_idx, col_idx, width)
+
+    ws.write_row(0, 0, headers, header_fmt)
+
+    write_row = ws.write_row
+    row_count = 0
+    for row_idx, values in enumerate(rows, 1):
+        write_row(row_idx, 0, values, body_fmt)
+        row_count += 1
+
+    # O arquivo só é montado no close: em caso de erro antes daqui nada é gravado
+    wb.close()
+    return row_count
+
+
+# Partes fixas do pacote .xlsx usadas por _write_xlsx_direct
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+_XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{sheet_name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+# Estilos: 0 = padrão, 1 = corpo (borda fina), 2 = cabeçalho (negrito, fundo cinza, borda, centralizado)
+_XLSX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2">'
+    '<font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font>'
+    '</fonts>'
+    '<fills count="3">'
+    '<fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="00D9D9D9"/><bgColor rgb="00D9D9D9"/></patternFill></fill>'
+    '</fills>'
+    '<borders count="2">'
+    '<border><left/><right/><top/><bottom/><diagonal/></border>'
+    '<border><left style="thin"/><right style="thin"/><top style="thin"/><bottom style="thin"/><diagonal/></border>'
+    '</borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="1" xfId="0" applyBorder="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="2" borderId="1" xfId="0" '
+    'applyFont="1" applyFill="1" applyBorder="1" applyAlignment="1">'
+    '<alignment horizontal="center" vertical="center" wrapText="1"/></xf>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+# Caracteres de controle proibidos no XML 1.0 (o xml_escape não trata)
+_XML_ILLEGAL_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+def _escape_control_char(match):
+    """Grava o caractere como _xHHHH_, o escape do próprio formato (o mesmo que o xlsxwriter usa)"""
+    return f'_x{ord(match.group()):04X}_'
+
+
+def _xlsx_cell(ref, value, style):
+    """Monta o XML de uma célula: números como <v>, textos como inlineStr"""
+    if value is None or value == '':
+        return f'<c r="{ref}" s="{style}"/>'
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c r="{ref}" s="{style}"><v>{value}</v></c>'
+    text = str(value)
+    if _XML_ILLEGAL_RE.search(text):
+        text = _XML_ILLEGAL_RE.sub(_escape_control_char, text)
+    space = ' xml:space="preserve"' if text != text.strip() else ''
+    return f'<c r="{ref}" s="{style}" t="inlineStr"><is><t{space}>{xml_escape(text)}</t></is></c>'
+
+
+def _write_xlsx_direct(headers, column_widths, rows, output_file):
+    """
+    Grava o .xlsx diretamente (XML dentro de um zip), sem o modelo de objetos do openpyxl.
+
+    A planilha tem só um estilo de cabeçalho e um de corpo, então as partes fixas
+    do pacote são constantes e as linhas são escritas em streaming no
+    xl/worksheets/sheet1.xml. Retorna o número de linhas de dados.
+    """
+    letters = [get_column_letter(col_idx) for col_idx in range(1, len(headers) + 1)]
+
+    with zipfile.ZipFile(output_file, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', _XLSX_CONTENT_TYPES)
+        zf.writestr('_rels/.rels', _XLSX_ROOT_RELS)
+        zf.writestr('xl/workbook.xml', _XLSX_WORKBOOK.format(sheet_name=xml_escape(SHEET_TITLE, {'"': '&quot;'})))
+        zf.writestr('xl/_rels/workbook.xml.rels', _XLSX_WORKBOOK_RELS)
+        zf.writestr('xl/styles.xml', _XLSX_STYLES)
+
+        with zf.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            cols = ''.join(f'<col min="{i}" max="{i}" width="{w}" customWidth="1"/>'
+                           for i, w in enumerate(column_widths, 1))
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                f'<cols>{cols}</cols><sheetData>'
+            ).encode('utf-8'))
+
+            cells = ''.join(_xlsx_cell(f'{letter}1', header, 2) for letter, header in zip(letters, headers))
+            sheet.write(f'<row r="1">{cells}</row>'.encode('utf-8'))
+
+            # Referências locais para o laço por linha
+            write = sheet.write
+            xlsx_cell = _xlsx_cell
+            row_count = 0
+            for r, values in enumerate(rows, 2):
+                cells = ''.join(xlsx_cell(f'{letter}{r}', value, 1) for letter, value in zip(letters, values))
+                write(f'<row r="{r}">{cells}</row>'.encode('utf-8'))
+                row_count += 1
+
+            sheet.write(b'</sheetData></worksheet>')
+
+    return row_count
+
+
+def _stream_reports(json_path):
+    """Lê os relatórios um a um com o ijson, sem carregar o arquivo inteiro"""
+    with open(json_path, 'rb') as f:
+        # Espia o primeiro caractere: '[' é uma lista de relatórios, '{' é um relatório só
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        f.seek(0)
+
+        prefix = '' if first == b'{' else 'item'
+        yield from ijson.items(f, prefix, use_float=True)
+
+
+def load_reports(json_path):
+    """
+    Abre o JSON de relatórios.
+
+    Com o ijson instalado devolve um gerador que lê um relatório por vez
+    (memória proporcional a um relatório, não ao arquivo). Sem ele, carrega
+    o arquivo inteiro (com o orjson sobre um mmap, se disponível) e devolve uma lista.
+    """
+    if ijson is not None:
+        return _stream_reports(json_path)
+
+    with open(json_path, 'rb') as f:
+        if orjson is not None and os.fstat(f.fileno()).st_size:
+            # O orjson aceita memoryview: lê direto do arquivo mapeado, sem copiar
+            # o conteúdo inteiro para um objeto bytes antes do parse
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                reports = orjson.loads(view)
+        else:
+            reports = json.loads(f.read())
+
+    if not isinstance(reports, list):
+        reports = [reports]  # Converte para lista se for apenas um objeto
+    return reports
 
 
-def json_to_excel(json_folder="ct_reports_json", output_file="ct_dose_report.xlsx"):
-    """Converte os dados JSON para Excel"""
+def json_to_excel(json_folder="ct_reports_json", output_file="ct_dose_report.xlsx", fast=False, workers=1,
+                  csv_sidecar=False, engine="openpyxl", output_format="xlsx"):
+    """
+    Converte os dados JSON para Excel
+
+    engine escolhe a biblioteca que grava o .xlsx ("openpyxl" ou "xlsxwriter");
+    fast=True ignora engine e grava o XML diretamente. Com output_format="csv",
+    grava apenas um CSV em output_file, sem gerar o Excel.
+
+    Com workers > 1, as linhas são montadas em paralelo por um pool de processos
+    (a gravação da planilha continua no processo principal). Com csv_sidecar,
+    grava também um .csv com as mesmas linhas ao lado do .xlsx.
+    """
     # Encontra o arquivo JSON coletivo
     json_all_path = os.path.join(json_folder, "ct_reports_all.json")
 
@@ -167,182 +616,101 @@ def json_to_excel(json_folder="ct_reports_json", output_file="ct_dose_report.xls
         json_all_path = json_files[0]
         print(f"ℹ️ Arquivo ct_reports_all.json não encontrado, usando '{os.path.basename(json_all_path)}'")
 
-    # Lê o arquivo JSON
+    # Lê o arquivo JSON (em streaming quando o ijson está disponível)
     try:
-        with open(json_all_path, 'r', encoding='utf-8') as f:
-            reports = json.load(f)
+        reports = load_reports(json_all_path)
 
-        if not isinstance(reports, list):
-            reports = [reports]  # Converte para lista se for apenas um objeto
-
-        print(f"✓ Leitura de {len(reports)} relatórios do arquivo '{os.path.basename(json_all_path)}'")
+        if isinstance(reports, list):
+            print(f"✓ Leitura de {len(reports)} relatórios do arquivo '{os.path.basename(json_all_path)}'")
     except Exception as e:
         print(f"❌ Erro ao ler JSON: {str(e)}")
         return False
 
-    # Cria uma nova planilha Excel
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Relatórios CT"
-
-    # Define os cabeçalhos
-    headers = [
-        "ID do paciente", "Nome do paciente", "Sexo", "Data de nascimento", "Idade", "Pesquisa de interesse",
-        "Data do exame", "Descrição da série", "Scan mode", "mAs",
-        "kV", "CTDIvol", "DLP", "DLP total", "Phantom type", "SSDE", "Avg scan size"
-    ]
-
-    # Formata os cabeçalhos
-    header_fill = PatternFill(start_color="D9D9D9", end_color="D9D9D9", fill_type="solid")
-    header_font = Font(bold=True)
-    header_alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-
-    # Adiciona cabeçalhos na primeira linha
-    for col_idx, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_idx, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-        cell.border = border
-
-    # Define larguras das colunas
-    ws.column_dimensions['A'].width = 15  # ID do paciente
-    ws.column_dimensions['B'].width = 25  # ✨ Nome do paciente - NOVO
-    ws.column_dimensions['C'].width = 10  # Sexo
-    ws.column_dimensions['D'].width = 18  # Data de nascimento
-    ws.column_dimensions['E'].width = 10  # Idade
-    ws.column_dimensions['F'].width = 20  # Pesquisa de interesse
-    ws.column_dimensions['G'].width = 18  # Data do exame
-    ws.column_dimensions['H'].width = 20  # Descrição da série
-    ws.column_dimensions['I'].width = 15  # Scan mode
-    ws.column_dimensions['J'].width = 10  # mAs
-    ws.column_dimensions['K'].width = 10  # kV
-    ws.column_dimensions['L'].width = 10  # CTDIvol
-    ws.column_dimensions['M'].width = 10  # DLP
-    ws.column_dimensions['N'].width = 10  # DLP total
-    ws.column_dimensions['O'].width = 15  # Phantom type
-    ws.column_dimensions['P'].width = 10  # SSDE
-    ws.column_dimensions['Q'].width = 15  # Avg scan size
-
-    # Linha atual para inserção
-    row_idx = 2
-
-    # Processa cada relatório
-    for report in reports:
-        essential = report.get('essential', {})
-
-        # Obtém informações básicas do paciente/estudo
-        patient_id = essential.get('patient_id', '')
-        patient_name = essential.get('patient_name', '')
-        sex = essential.get('sex', '')
-        birth_date = essential.get('birth_date', '')
-        study_date = essential.get('study_date', '')
-
-        # DLP total - direto do JSON, sem extração
-        irradiation = report.get('irradiation', {})
-        total_dlp = irradiation.get('total_dlp', '')
+    # Conta os relatórios à medida que são lidos (no streaming o total só é conhecido no fim)
+    report_count = 0
+
+    def counted(items):
+        nonlocal report_count
+        for item in items:
+            report_count += 1
+            yield item
+
+    if output_format == "csv":
+        write_output = _write_csv
+        csv_sidecar = False  # O próprio arquivo de saída já é o CSV
+    elif fast:
+        write_output = _write_xlsx_direct
+    elif engine == "xlsxwriter":
+        if xlsxwriter is None:
+            print("❌ Erro: o engine 'xlsxwriter' requer o pacote xlsxwriter (pip install xlsxwriter)")
+            return False
+        write_output = _write_xlsx_xlsxwriter
+    else:
+        write_output = _write_xlsx_openpyxl
 
-        # Processa cada aquisição/série como uma linha
-        acquisitions = report.get('acquisitions', [])
-        if acquisitions:
-            for acquisition in acquisitions:
-                # Obtém informações desta aquisição específica
-                scan_info = extract_scan_info(acquisition)
-
-                # Insere valores na planilha com tratamento explícito para None/null
-                ws.cell(row=row_idx, column=1, value=patient_id if patient_id is not None else '-')
-                ws.cell(row=row_idx, column=2, value=patient_name if patient_name is not None else '-')
-                ws.cell(row=row_idx, column=3, value=sex if sex is not None else '-')
-                ws.cell(row=row_idx, column=4, value=birth_date if birth_date is not None else '-')
-
-                # Calcula a idade com base na data de nascimento e data do exame
-                age = calculate_age(birth_date, study_date)
-                ws.cell(row=row_idx, column=5, value=age)
-
-                ws.cell(row=row_idx, column=6, value=scan_info['protocol'])
-                ws.cell(row=row_idx, column=7, value=study_date if study_date is not None else '-')
-                # Descrição da série - tratamento especial para garantir '-' em caso de null
-                description_value = scan_info['description']
-                # Verificação extra rigorosa para garantir que não seja null, string vazia, espaços, etc.
-                is_empty = (description_value is None or description_value == '' or
-                            description_value.strip() == '' or description_value == 'null')
-                ws.cell(row=row_idx, column=8, value='-' if is_empty else description_value)
-                ws.cell(row=row_idx, column=9, value=scan_info['scan_mode'])
-                ws.cell(row=row_idx, column=10, value=scan_info['tube_current'])
-                ws.cell(row=row_idx, column=11, value=scan_info['kv'])
-                ws.cell(row=row_idx, column=12, value=scan_info['ctdivol'])
-                ws.cell(row=row_idx, column=13, value=scan_info['dlp'])
-                ws.cell(row=row_idx, column=14, value=total_dlp if total_dlp is not None else '-')
-                ws.cell(row=row_idx, column=15, value=scan_info['phantom_type'])
-                ws.cell(row=row_idx, column=16, value=scan_info['ssde'])
-                ws.cell(row=row_idx, column=17, value=scan_info['avg_scan_size'])
-
-                # Aplica borda a todas as células
-                for col_idx in range(1, 17):
-                    ws.cell(row=row_idx, column=col_idx).border = border
-
-                row_idx += 1
-        else:
-            # Se não houver aquisições, adiciona pelo menos uma linha com dados básicos
-            ws.cell(row=row_idx, column=1, value=patient_id if patient_id is not None else '-')
-            ws.cell(row=row_idx, column=2, value=patient_name if patient_name is not None else '-')
-            ws.cell(row=row_idx, column=3, value=sex if sex is not None else '-')
-            ws.cell(row=row_idx, column=4, value=birth_date if birth_date is not None else '-')
-
-            # Calcula a idade para esta linha também
-            age = calculate_age(birth_date, study_date)
-            ws.cell(row=row_idx, column=5, value=age)
-
-            ws.cell(row=row_idx, column=6, value='-')
-            ws.cell(row=row_idx, column=7, value=study_date if study_date is not None else '-')
-            ws.cell(row=row_idx, column=8, value='-')
-            ws.cell(row=row_idx, column=9, value='-')
-            ws.cell(row=row_idx, column=10, value='-')
-            ws.cell(row=row_idx, column=11, value='-')
-            ws.cell(row=row_idx, column=12, value='-')
-            ws.cell(row=row_idx, column=13, value='-')
-            ws.cell(row=row_idx, column=14, value=total_dlp if total_dlp is not None else '-')
-            ws.cell(row=row_idx, column=15, value='-')
-            ws.cell(row=row_idx, column=16, value='-')
-            ws.cell(row=row_idx, column=17, value='-')
-
-            # Aplica borda a todas as células
-            for col_idx in range(1, 18):
-                ws.cell(row=row_idx, column=col_idx).border = border
-
-            row_idx += 1
+    if workers > 1:
+        rows = _iter_report_rows_parallel(counted(reports), workers)
+    else:
+        rows = iter_report_rows(counted(reports))
 
     # Salva a planilha
     try:
-        wb.save(output_file)
-        print(f"✅ Planilha Excel salva com sucesso: '{output_file}'")
-        print(f"   Total de linhas geradas: {row_idx - 2}")
+        # Tudo é gravado em temporários, que só substituem os arquivos de saída no sucesso
+        with _replace_on_success(output_file) as temp_output:
+            if csv_sidecar:
+                csv_file = os.path.splitext(output_file)[0] + '.csv'
+                with _replace_on_success(csv_file) as temp_csv, \
+                        open(temp_csv, 'w', newline='', encoding='utf-8') as f:
+                    row_count = write_output(_HEADERS, _COLUMN_WIDTHS, _tee_csv(rows, _HEADERS, f), temp_output)
+            else:
+                row_count = write_output(_HEADERS, _COLUMN_WIDTHS, rows, temp_output)
+        if not isinstance(reports, list):
+            print(f"✓ Leitura de {report_count} relatórios do arquivo '{os.path.basename(json_all_path)}'")
+        if output_format == "csv":
+            print(f"✅ CSV salvo com sucesso: '{output_file}'")
+        else:
+            print(f"✅ Planilha Excel salva com sucesso: '{output_file}'")
+        print(f"   Total de linhas geradas: {row_count}")
+        if csv_sidecar:
+            print(f"✅ CSV salvo com sucesso: '{csv_file}'")
         return True
+    except _JSON_STREAM_ERRORS as e:
+        print(f"❌ Erro ao ler JSON: {str(e)}")
+        return False
     except Exception as e:
         print(f"❌ Erro ao salvar planilha Excel: {str(e)}")
         return False
 
 
 if __name__ == "__main__":
+    import argparse
+
     parser = argparse.ArgumentParser(description='Conversor de relatórios JSON de CT para Excel')
     parser.add_argument('--input-folder', type=str, default='ct_reports_json',
                         help='Pasta contendo os arquivos JSON (padrão: ct_reports_json)')
-    parser.add_argument('--output', type=str, default='ct_dose_report.xlsx',
-                        help='Nome do arquivo Excel de saída (padrão: ct_dose_report.xlsx)')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Nome do arquivo de saída (padrão: ct_dose_report.xlsx, ou ct_dose_report.csv com --format csv)')
+    parser.add_argument('--format', choices=['xlsx', 'csv'], default='xlsx',
+                        help='Formato de saída (padrão: xlsx); csv é bem mais rápido para muitos relatórios')
+    parser.add_argument('--fast', action='store_true',
+                        help='Gera o .xlsx diretamente em XML, sem o openpyxl (mais rápido para muitos relatórios)')
+    parser.add_argument('--engine', choices=['openpyxl', 'xlsxwriter'], default='openpyxl',
+                        help='Biblioteca usada para gravar o Excel (padrão: openpyxl)')
+    parser.add_argument('--csv', action='store_true',
+                        help='Grava também um .csv com as mesmas linhas ao lado do arquivo Excel')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processos para montar as linhas em paralelo (padrão: 1, sem paralelismo)')
 
     args = parser.parse_args()
+    if args.output is None:
+        args.output = 'ct_dose_report.csv' if args.format == 'csv' else 'ct_dose_report.xlsx'
 
     print(f"\n{'=' * 80}")
     print(f"CTDoseExcel - Conversor de Relatórios JSON para Excel")
     print(f"{'=' * 80}")
     print(f"Pasta de entrada (JSONs): {args.input_folder}")
-    print(f"Arquivo de saída (Excel): {args.output}")
+    print(f"Arquivo de saída ({'CSV' if args.format == 'csv' else 'Excel'}): {args.output}")
     print(f"{'=' * 80}\n")
 
-    json_to_excel(args.input_folder, args.output)
+    json_to_excel(args.input_folder, args.output, fast=args.fast, workers=args.workers, csv_sidecar=args.csv,
+                  engine=args.engine, output_format=args.format)
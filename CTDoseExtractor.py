@@ -1,13 +1,112 @@
-import pymupdf
 import re
 import os
-import glob
-from dataclasses import dataclass, asdict
-from typing import List, Optional, Dict, Any
+import sys
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property, lru_cache
+from dataclasses import dataclass, field
+from typing import List, Optional, Dict, Any, Tuple
 import json
 
+try:
+    # Serializador em C, bem mais rápido que o json da biblioteca padrão com indent
+    import orjson
+except ImportError:
+    orjson = None
 
-@dataclass
+# Mensagens do modo debug (o nome fixo vale também nos processos do pool, onde __name__ muda)
+logger = logging.getLogger("CTDoseExtractor")
+
+
+# Handler do --debug; só a CLI (e os processos do pool que ela abre) configura o logging
+_debug_handler = None
+
+
+def _enable_debug_logging():
+    """Liga o debug do extrator com saída simples no stdout, junto dos demais prints (uso da CLI)"""
+    global _debug_handler
+    if _debug_handler is None:
+        _debug_handler = logging.StreamHandler(sys.stdout)
+        _debug_handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(_debug_handler)
+        logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+
+
+# google-re2 (motor baseado em autômatos, sem backtracking) só quando pedido com CTDOSE_RE2=1:
+# nos relatórios comuns o custo fixo por chamada deixa o re2 mais lento que o re, e o retrocesso
+# que ele evitaria já não acontece nos padrões atuais. A variável de ambiente vale também nos workers
+re2 = None
+if os.environ.get('CTDOSE_RE2') == '1':
+    try:
+        import re2
+    except ImportError:
+        pass
+
+
+# No re2 o \s, o \d e o \w são só ASCII; no re eles valem para Unicode (ex.: "Patient ID:\u2007123").
+# Conteúdo das classes equivalentes às do re: os espaços são os de str.isspace (todos abaixo de U+3001),
+# os dígitos são a categoria Nd e as letras de palavra são letras, números e "_"
+_RE2_UNICODE_CLASSES = {
+    's': ''.join(f'\\x{{{code:X}}}' for code in range(0x3001) if chr(code).isspace()),
+    'd': r'\p{Nd}',
+    'w': r'\p{L}\p{N}_',
+}
+
+
+def _unicode_classes_for_re2(pattern: str) -> Optional[str]:
+    r"""
+    Troca \s, \d e \w (e as negações \S, \D, \W) por classes Unicode que o re2 entende,
+    para casar os mesmos caracteres que o re. None se o padrão não puder ser convertido.
+    """
+    parts = []
+    in_class = False
+    position = 0
+    while position < len(pattern):
+        char = pattern[position]
+        if char == '\\' and position + 1 < len(pattern):
+            escape = pattern[position + 1]
+            body = _RE2_UNICODE_CLASSES.get(escape.lower())
+            if body is None:
+                parts.append(pattern[position:position + 2])
+            elif escape.islower():
+                parts.append(body if in_class else f'[{body}]')
+            elif in_class:
+                return None  # Negação dentro de uma classe ([\S.]) não tem tradução direta
+            else:
+                parts.append(f'[^{body}]')
+            position += 2
+            continue
+        if char == '[' and not in_class:
+            in_class = True
+        elif char == ']' and in_class:
+            in_class = False
+        parts.append(char)
+        position += 1
+    return ''.join(parts)
+
+
+def _compile_pattern(pattern: str, ignore_case: bool = True):
+    """Compila com re2 quando ativado (CTDOSE_RE2=1); um padrão que o re2 não suporte usa o re"""
+    if re2 is not None:
+        re2_pattern = _unicode_classes_for_re2(pattern)
+        if re2_pattern is not None:
+            options = re2.Options()
+            options.case_sensitive = not ignore_case
+            options.log_errors = False
+            try:
+                return re2.compile(re2_pattern, options)
+            except re2.error:
+                pass
+    return re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+
+
+def _literal_prefix(pattern: str) -> str:
+    """Rótulo literal do início do padrão (até o primeiro metacaractere)"""
+    return re.split(r'[\\(\[.*+?{|^$]', pattern, maxsplit=1)[0]
+
+
+@dataclass(slots=True)
 class EssentialInfo:
     """Informações essenciais para identificação do exame"""
     patient_id: str = ""
@@ -18,8 +117,19 @@ class EssentialInfo:
     birth_date: str = ""
     sex: str = ""
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'patient_id': self.patient_id,
+            'patient_name': self.patient_name,
+            'study_id': self.study_id,
+            'accession_number': self.accession_number,
+            'study_date': self.study_date,
+            'birth_date': self.birth_date,
+            'sex': self.sex
+        }
+
 
-@dataclass
+@dataclass(slots=True)
 class XRaySourceParams:
     identification: str = ""
     kvp: str = ""
@@ -27,8 +137,17 @@ class XRaySourceParams:
     tube_current: str = ""
     exposure_time_per_rotation: Optional[str] = None
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'identification': self.identification,
+            'kvp': self.kvp,
+            'max_tube_current': self.max_tube_current,
+            'tube_current': self.tube_current,
+            'exposure_time_per_rotation': self.exposure_time_per_rotation
+        }
+
 
-@dataclass
+@dataclass(slots=True)
 class CTDose:
     mean_ctdivol: str = ""
     phantom_type: str = ""
@@ -36,8 +155,17 @@ class CTDose:
     size_specific_dose: Optional[str] = None
     ctdivol_alert_value: Optional[str] = None
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'mean_ctdivol': self.mean_ctdivol,
+            'phantom_type': self.phantom_type,
+            'dlp': self.dlp,
+            'size_specific_dose': self.size_specific_dose,
+            'ctdivol_alert_value': self.ctdivol_alert_value
+        }
+
 
-@dataclass
+@dataclass(slots=True)
 class CTAcquisitionParams:
     exposure_time: str = ""
     scanning_length: str = ""
@@ -46,8 +174,18 @@ class CTAcquisitionParams:
     num_xray_sources: str = ""
     pitch_factor: Optional[str] = None
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'exposure_time': self.exposure_time,
+            'scanning_length': self.scanning_length,
+            'nominal_single_collimation': self.nominal_single_collimation,
+            'nominal_total_collimation': self.nominal_total_collimation,
+            'num_xray_sources': self.num_xray_sources,
+            'pitch_factor': self.pitch_factor
+        }
+
 
-@dataclass
+@dataclass(slots=True)
 class CTAcquisition:
     protocol: str = ""
     target_region: str = ""
@@ -59,16 +197,37 @@ class CTAcquisition:
     xray_source_params: XRaySourceParams = None
     ct_dose: CTDose = None
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'protocol': self.protocol,
+            'target_region': self.target_region,
+            'acquisition_type': self.acquisition_type,
+            'procedure_context': self.procedure_context,
+            'irradiation_event_uid': self.irradiation_event_uid,
+            'comment': self.comment,
+            'acquisition_params': self.acquisition_params.to_dict() if self.acquisition_params else None,
+            'xray_source_params': self.xray_source_params.to_dict() if self.xray_source_params else None,
+            'ct_dose': self.ct_dose.to_dict() if self.ct_dose else None
+        }
+
 
-@dataclass
+@dataclass(slots=True)
 class IrradiationInfo:
     start_time: str = ""
     end_time: str = ""
     total_events: str = ""
     total_dlp: str = ""
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'total_events': self.total_events,
+            'total_dlp': self.total_dlp
+        }
+
 
-@dataclass
+@dataclass(slots=True)
 class DeviceInfo:
     observer_name: str = ""
     manufacturer: str = ""
@@ -76,116 +235,328 @@ class DeviceInfo:
     serial_number: str = ""
     physical_location: str = ""
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'observer_name': self.observer_name,
+            'manufacturer': self.manufacturer,
+            'model_name': self.model_name,
+            'serial_number': self.serial_number,
+            'physical_location': self.physical_location
+        }
 
-@dataclass
+
+@dataclass(slots=True)
 class CTScanReportMinimal:
     # Informações básicas para identificação
     hospital: str = ""
     report_date: str = ""
 
     # Dados essenciais para identificação
-    essential: EssentialInfo = None
+    essential: EssentialInfo = field(default_factory=EssentialInfo)
 
     # Dados técnicos
-    device: DeviceInfo = None
-    irradiation: IrradiationInfo = None
-    acquisitions: List[CTAcquisition] = None
+    device: DeviceInfo = field(default_factory=DeviceInfo)
+    irradiation: IrradiationInfo = field(default_factory=IrradiationInfo)
+    acquisitions: List[CTAcquisition] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Monta o dict do relatório diretamente (mesmo formato do asdict, sem a cópia recursiva)"""
+        return {
+            'hospital': self.hospital,
+            'report_date': self.report_date,
+            'essential': self.essential.to_dict(),
+            'device': self.device.to_dict(),
+            'irradiation': self.irradiation.to_dict(),
+            'acquisitions': [acquisition.to_dict() for acquisition in self.acquisitions]
+        }
 
-    def __post_init__(self):
-        if self.essential is None:
-            self.essential = EssentialInfo()
-        if self.device is None:
-            self.device = DeviceInfo()
-        if self.irradiation is None:
-            self.irradiation = IrradiationInfo()
-        if self.acquisitions is None:
-            self.acquisitions = []
+
+# Padrões MÚLTIPLOS para cada identificador essencial
+# Isso aumenta as chances de capturar os dados mesmo com formatação estranha
+_ESSENTIAL_PATTERN_SOURCES = {
+    'patient_id': [
+        r'Patient\s*ID:\s*(\d+)',
+        r'PatientID:\s*(\d+)',
+        r'Patient\s*ID\s*:\s*(\d+)',
+    ],
+    'study_id': [
+        r'Study\s*ID:\s*(\d+)',
+        r'StudyID:\s*(\d+)',
+        r'Study\s*ID\s*:\s*(\d+)'
+    ],
+    'accession_number': [
+        r'Accession\s*Number:\s*(\d+)',
+        r'AccessionNumber:\s*(\d+)',
+        r'Accession\s*Number\s*:\s*(\d+)'
+    ],
+    # O valor vai do primeiro caractere que não é espaço até o fim da linha. Começar por \S
+    # evita que o espaço depois do ":" e o grupo disputem os mesmos caracteres (retrocesso quadrático);
+    # esse espaço não atravessa a quebra de linha ([^\S\n]), senão um campo vazio pegaria a linha seguinte
+    'study_date': [
+        r'Study\s*Date:[^\S\n]*(\S[^\n]*)',
+        r'StudyDate:[^\S\n]*(\S[^\n]*)',
+        r'Study\s*Date\s*:[^\S\n]*(\S[^\n]*)'
+    ],
+    'birth_date': [
+        r"Patient's\s*Birth\s*Date:[^\S\n]*(\S[^\n]*)",
+        r"Patient's\s*Birth\s*Date\s*:[^\S\n]*(\S[^\n]*)",
+        r"Birth\s*Date:[^\S\n]*(\S[^\n]*)",
+        r"BirthDate:[^\S\n]*(\S[^\n]*)"
+    ],
+    'sex': [
+        r"Patient's\s*Sex:\s*(\w+)",
+        r"Patient's\s*Sex\s*:\s*(\w+)",
+        r"Sex:\s*(\w+)",
+        r"Gender:\s*(\w+)"
+    ]
+}
+
+# Padrões para dados técnicos (mantidos)
+_TECHNICAL_PATTERN_SOURCES = {
+    # Dispositivo
+    'device_name': r"Device Observer Name:\s*(.+)",
+    'manufacturer': r"Device Observer Manufacturer:\s*(.+)",
+    'model_name': r"Device Observer Model Name:\s*(.+)",
+    'serial_number': r"Device Observer Serial Number:\s*(.+)",
+    'location': r"Device Observer Physical Location during observation:\s*(.+)",
+
+    # Irradiação (com unidades)
+    'start_irradiation': r"Start of X-Ray Irradiation:\s*(.+)",
+    'end_irradiation': r"End of X-Ray Irradiation:\s*(.+)",
+    'total_events': r"Total Number of Irradiation Events\s*=\s*([\d.]+\s*events)",
+    'total_dlp': r"CT Dose Length Product Total\s*=\s*([\d.]+\s*mGy\.cm)",
+
+    # Aquisições
+    'protocol': r"Acquisition Protocol:\s*(.+)",
+    'target_region': r"Target Region:\s*(.+)",
+    'acquisition_type': r"CT Acquisition Type:\s*(.+)",
+    'procedure_context': r"Procedure Context:\s*(.+)",
+    'irradiation_uid': r"Irradiation Event UID:\s*(.+)",
+    'comment': r"Comment:\s*(.+)",
+
+    # Parâmetros de aquisição (com unidades)
+    'exposure_time': r"Exposure Time\s*=\s*([\d.]+\s*s)",
+    'scanning_length': r"Scanning Length\s*=\s*([\d.]+\s*mm)",
+    'single_collimation': r"Nominal Single Collimation Width\s*=\s*([\d.]+\s*mm)",
+    'total_collimation': r"Nominal Total Collimation Width\s*=\s*([\d.]+\s*mm)",
+    'num_sources': r"Number of X-Ray Sources\s*=\s*([\d.]+\s*X-Ray sources)",
+    'pitch_factor': r"Pitch Factor\s*=\s*([\d.]+\s*ratio)",
+
+    # Fonte de raios-X (com unidades)
+    'source_id': r"Identification of the X-Ray Source:\s*(.+)",
+    'kvp': r"KVP\s*=\s*([\d.]+\s*kV)",
+    'max_current': r"Maximum X-Ray Tube Current\s*=\s*([\d.]+\s*mA)",
+    # Sem lookbehind, para compilar também no re2: ocorrências precedidas de "Maximum " são descartadas
+    # na leitura das seções (em geral o próprio max_current já consome esse trecho)
+    'tube_current': r"X-Ray Tube Current\s*=\s*([\d.]+\s*mA)",
+    'rotation_time': r"Exposure Time per Rotation\s*=\s*([\d.]+\s*s)",
+
+    # Dose (com unidades)
+    'mean_ctdivol': r"Mean CTDIvol\s*=\s*([\d.]+\s*mGy)",
+    'phantom_type': r"CTDIw Phantom Type:\s*(.+)",
+    'dlp': r"DLP\s*=\s*([\d.]+\s*mGy\.cm)",
+    'specific_dose': r"Size Specific Dose Estimation\s*=\s*([\d.]+\s*mGy)",
+    'alert_value': r"CTDIvol Alert Value\s*=\s*([\d.]+\s*mGy)"
+}
+
+# Campos essenciais que saem direto dos padrões (nome e data do estudo têm extração própria)
+_ESSENTIAL_REGEX_FIELDS = ('patient_id', 'study_id', 'accession_number', 'birth_date', 'sex')
+
+# (campo do dataclass, chave em _TECHNICAL_PATTERN_SOURCES) do dispositivo e da irradiação
+_DEVICE_FIELDS = (
+    ('observer_name', 'device_name'),
+    ('manufacturer', 'manufacturer'),
+    ('model_name', 'model_name'),
+    ('serial_number', 'serial_number'),
+)
+_IRRADIATION_FIELDS = (
+    ('start_time', 'start_irradiation'),
+    ('end_time', 'end_irradiation'),
+    ('total_events', 'total_events'),
+    ('total_dlp', 'total_dlp'),
+)
+
+# (campo do dataclass, campo da seção) de cada parte de uma aquisição CT
+_ACQUISITION_INFO_FIELDS = (
+    ('protocol', 'protocol'),
+    ('target_region', 'target_region'),
+    ('acquisition_type', 'acquisition_type'),
+    ('procedure_context', 'procedure_context'),
+    ('irradiation_event_uid', 'irradiation_uid'),
+    ('comment', 'comment'),
+)
+_ACQUISITION_PARAM_FIELDS = (
+    ('exposure_time', 'exposure_time'),
+    ('scanning_length', 'scanning_length'),
+    ('nominal_single_collimation', 'single_collimation'),
+    ('nominal_total_collimation', 'total_collimation'),
+    ('num_xray_sources', 'num_sources'),
+    ('pitch_factor', 'pitch_factor'),
+)
+_XRAY_SOURCE_FIELDS = (
+    ('identification', 'source_id'),
+    ('kvp', 'kvp'),
+    ('max_tube_current', 'max_current'),
+    ('tube_current', 'tube_current'),
+    ('exposure_time_per_rotation', 'rotation_time'),
+)
+_CT_DOSE_FIELDS = (
+    ('mean_ctdivol', 'mean_ctdivol'),
+    ('phantom_type', 'phantom_type'),
+    ('dlp', 'dlp'),
+    ('size_specific_dose', 'specific_dose'),
+    ('ctdivol_alert_value', 'alert_value'),
+)
+
+# Campos técnicos que aparecem dentro de cada seção de aquisição
+_ACQUISITION_FIELDS = (
+    'protocol', 'target_region', 'acquisition_type', 'procedure_context', 'irradiation_uid', 'comment',
+    'exposure_time', 'scanning_length', 'single_collimation', 'total_collimation', 'num_sources',
+    'pitch_factor', 'source_id', 'kvp', 'max_current', 'tube_current', 'rotation_time',
+    'mean_ctdivol', 'phantom_type', 'dlp', 'specific_dose', 'alert_value'
+)
+
+
+@lru_cache(maxsize=None)
+def _compiled_patterns() -> Tuple[Dict[str, Tuple], Dict[str, Tuple], Any, Any]:
+    """
+    Compila os padrões uma única vez por processo, na primeira extração
+    (re2 quando ativado com CTDOSE_RE2=1, senão re).
+
+    Devolve (padrões essenciais, padrões técnicos, regex mestre das aquisições, rótulos das
+    aquisições); quem só importa o módulo ou roda o --help não paga a compilação.
+    """
+    # As alternativas de cada campo essencial viram uma única alternância: uma só busca no texto,
+    # com o match mais à esquerda vencendo (cada alternativa tem exatamente um grupo de captura).
+    # Cada campo guarda (rótulos literais em minúsculas, regex): se nenhum rótulo aparece no texto
+    # em minúsculas, nenhuma alternativa pode casar e a busca é dispensada
+    essential_patterns = {
+        field: (
+            tuple(dict.fromkeys(_literal_prefix(pattern).lower() for pattern in patterns)),
+            _compile_pattern('|'.join(f'(?:{pattern})' for pattern in patterns))
+        )
+        for field, patterns in _ESSENTIAL_PATTERN_SOURCES.items()
+    }
+    # Os rótulos técnicos têm grafia fixa no relatório (DICOM SR), então dispensam o IGNORECASE:
+    # sem ele o re consegue usar a busca rápida pelo prefixo literal de cada padrão.
+    # Cada campo guarda (rótulo literal, regex): o rótulo serve de pré-filtro barato com 'in'
+    technical_patterns = {
+        field: (_literal_prefix(pattern), _compile_pattern(pattern, ignore_case=False))
+        for field, pattern in _TECHNICAL_PATTERN_SOURCES.items()
+    }
+
+    # Regex mestre das seções de aquisição: uma única varredura por seção em vez de ~22 buscas.
+    # Fica no re (e não no re2): nas seções curtas o custo fixo por match do re2 pesa mais que a varredura
+    acquisition_pattern = re.compile(
+        '|'.join(f'(?P<{field}>{_TECHNICAL_PATTERN_SOURCES[field]})' for field in _ACQUISITION_FIELDS)
+    )
+    # Rótulos das aquisições. Os matches do finditer não se sobrepõem: um valor que contém um rótulo
+    # (ex.: "Comment:" vazio, cujo (.+) pega a linha seguinte) esconde esse campo da varredura
+    acquisition_label_pattern = re.compile(
+        '|'.join(re.escape(_literal_prefix(_TECHNICAL_PATTERN_SOURCES[field])) for field in _ACQUISITION_FIELDS)
+    )
+    return essential_patterns, technical_patterns, acquisition_pattern, acquisition_label_pattern
+
+
+# Cabeçalho que abre cada seção de aquisição (ex.: "1.2 CT Acquisition")
+_ACQUISITION_SPLIT_PATTERN = re.compile(r'\d+\.\d+\s+CT\s+Acquisition')
+
+
+@lru_cache(maxsize=None)
+def _load_pymupdf():
+    """
+    Importa o PyMuPDF só na primeira extração (a importação leva ~0,1 s).
+
+    Devolve (módulo, flags do get_text): o preset de texto sem preservar ligaduras, que saem
+    expandidas (ex.: "ﬁ" → "fi") e assim não quebram os rótulos procurados pelos padrões.
+    """
+    import pymupdf
+    return pymupdf, pymupdf.TEXTFLAGS_TEXT & ~pymupdf.TEXT_PRESERVE_LIGATURES
+
+
+# Tamanho mínimo do texto da primeira página (sem os espaços das pontas) para ser um relatório com texto nativo
+_MIN_REPORT_TEXT = 200
+
+
+def _looks_like_report(first_page: str) -> bool:
+    """Checagem barata da primeira página: tem texto nativo e cara de relatório de dose"""
+    if len(first_page.strip()) < _MIN_REPORT_TEXT:
+        return False
+    return "Patient" in first_page or "CT" in first_page
+
+
+# Tabela do clean_extracted_text: remove APENAS NNBSP e caracteres invisíveis
+_INVISIBLE_CHARS = str.maketrans({
+    '\u00A0': ' ',  # Non-Breaking Space
+
+    # Outros espaços Unicode INVISÍVEIS (apenas os problemáticos)
+    '\u2000': ' ',  # En Quad
+    '\u2001': ' ',  # Em Quad
+    '\u2002': ' ',  # En Space
+    '\u2003': ' ',  # Em Space
+    '\u2009': ' ',  # Thin Space
+    '\u200A': ' ',  # Hair Space
+    '\u202F': ' ',  # Narrow No-Break Space
+
+    # Zero-width characters (completamente invisíveis)
+    '\u200B': None,  # Zero Width Space
+    '\u200C': None,  # Zero Width Non-Joiner
+    '\u200D': None,  # Zero Width Joiner
+    '\uFEFF': None,  # Zero Width No-Break Space (BOM)
+})
+
+# Padrões auxiliares dos métodos de extração e limpeza (compilados uma única vez)
+_TIME_FIX_RE = re.compile(r'(\d+:\d+):\s+(\d+)')
+_MULTI_SPACE_RE = re.compile(r'  +')
+_WHITESPACE_RE = re.compile(r'\s+')
+_PATIENT_NAME_LABEL_RE = re.compile(r"Patient's\s*Name\s*:", re.IGNORECASE)
+_PATIENT_NAME_PREFIX_RE = re.compile(r".*Patient's\s*Name\s*:\s*", re.IGNORECASE)
+_STUDY_DATE_LABEL_RE = re.compile(r'Study\s*Date\s*:', re.IGNORECASE)
+_STUDY_DATE_PREFIX_RE = re.compile(r'.*Study\s*Date\s*:\s*', re.IGNORECASE)
+_LOCATION_LABEL_RE = re.compile(r'Device Observer Physical Location during observation:', re.IGNORECASE)
+_LOCATION_PREFIX_RE = re.compile(r'.*Device Observer Physical Location during observation:\s*', re.IGNORECASE)
+_NUMBERED_FIELD_RE = re.compile(r'^\d+\.\d+')
+
+# Campos conhecidos do paciente que encerram a continuação do nome
+_PATIENT_FIELD_MARKERS = ('Patient ID', 'PatientID', 'Patient\'s Birth', 'Patient\'s Sex')
+
+
+@lru_cache(maxsize=1024)
+def _finish_value(value: str) -> str:
+    """
+    Corpo do finish_value, com cache: unidades, kVp, phantom e tipos de aquisição
+    se repetem entre as aquisições e entre os PDFs do lote.
+    """
+    # ✨ CORREÇÃO ESPECÍFICA: Remove espaço extra após : em horários (ex: "2:40: 38" → "2:40:38")
+    # Mas APENAS em contexto de horário (números:números). Fica por valor porque o \s+
+    # atravessaria quebras de linha no texto inteiro (o Study Date junta duas linhas antes)
+    return _TIME_FIX_RE.sub(r'\1:\2', value).strip()
 
 
 class CTReportExtractorMinimal:
-    def __init__(self):
-        # Padrões MÚLTIPLOS para cada identificador essencial
-        # Isso aumenta as chances de capturar os dados mesmo com formatação estranha
-        self.essential_patterns = {
-            'patient_id': [
-                r'Patient\s*ID:\s*(\d+)',
-                r'PatientID:\s*(\d+)',
-                r'Patient\s*ID\s*:\s*(\d+)',
-            ],
-            'study_id': [
-                r'Study\s*ID:\s*(\d+)',
-                r'StudyID:\s*(\d+)',
-                r'Study\s*ID\s*:\s*(\d+)'
-            ],
-            'accession_number': [
-                r'Accession\s*Number:\s*(\d+)',
-                r'AccessionNumber:\s*(\d+)',
-                r'Accession\s*Number\s*:\s*(\d+)'
-            ],
-            'study_date': [
-                r'Study\s*Date:\s*([^\\n]+?)(?=\n|$)',
-                r'StudyDate:\s*([^\\n]+?)(?=\n|$)',
-                r'Study\s*Date\s*:\s*([^\\n]+?)(?=\n|$)'
-            ],
-            'birth_date': [
-                r"Patient's\s*Birth\s*Date:\s*([^\\n]+?)(?=\n|$)",
-                r"Patient's\s*Birth\s*Date\s*:\s*([^\\n]+?)(?=\n|$)",
-                r"Birth\s*Date:\s*([^\\n]+?)(?=\n|$)",
-                r"BirthDate:\s*([^\\n]+?)(?=\n|$)"
-            ],
-            'sex': [
-                r"Patient's\s*Sex:\s*(\w+)",
-                r"Patient's\s*Sex\s*:\s*(\w+)",
-                r"Sex:\s*(\w+)",
-                r"Gender:\s*(\w+)"
-            ]
-        }
+    # Padrões compartilhados por todas as instâncias (compilados uma vez por processo, no primeiro uso)
+    acquisition_split_pattern = _ACQUISITION_SPLIT_PATTERN
 
-        # Padrões para dados técnicos (mantidos)
-        self.technical_patterns = {
-            # Dispositivo
-            'device_name': r"Device Observer Name:\s*(.+)",
-            'manufacturer': r"Device Observer Manufacturer:\s*(.+)",
-            'model_name': r"Device Observer Model Name:\s*(.+)",
-            'serial_number': r"Device Observer Serial Number:\s*(.+)",
-            'location': r"Device Observer Physical Location during observation:\s*(.+)",
-
-            # Irradiação (com unidades)
-            'start_irradiation': r"Start of X-Ray Irradiation:\s*(.+)",
-            'end_irradiation': r"End of X-Ray Irradiation:\s*(.+)",
-            'total_events': r"Total Number of Irradiation Events\s*=\s*([\d.]+\s*events)",
-            'total_dlp': r"CT Dose Length Product Total\s*=\s*([\d.]+\s*mGy\.cm)",
-
-            # Aquisições
-            'protocol': r"Acquisition Protocol:\s*(.+)",
-            'target_region': r"Target Region:\s*(.+)",
-            'acquisition_type': r"CT Acquisition Type:\s*(.+)",
-            'procedure_context': r"Procedure Context:\s*(.+)",
-            'irradiation_uid': r"Irradiation Event UID:\s*(.+)",
-            'comment': r"Comment:\s*(.+)",
-
-            # Parâmetros de aquisição (com unidades)
-            'exposure_time': r"Exposure Time\s*=\s*([\d.]+\s*s)",
-            'scanning_length': r"Scanning Length\s*=\s*([\d.]+\s*mm)",
-            'single_collimation': r"Nominal Single Collimation Width\s*=\s*([\d.]+\s*mm)",
-            'total_collimation': r"Nominal Total Collimation Width\s*=\s*([\d.]+\s*mm)",
-            'num_sources': r"Number of X-Ray Sources\s*=\s*([\d.]+\s*X-Ray sources)",
-            'pitch_factor': r"Pitch Factor\s*=\s*([\d.]+\s*ratio)",
-
-            # Fonte de raios-X (com unidades)
-            'source_id': r"Identification of the X-Ray Source:\s*(.+)",
-            'kvp': r"KVP\s*=\s*([\d.]+\s*kV)",
-            'max_current': r"Maximum X-Ray Tube Current\s*=\s*([\d.]+\s*mA)",
-            'tube_current': r"(?<!Maximum )X-Ray Tube Current\s*=\s*([\d.]+\s*mA)",
-            'rotation_time': r"Exposure Time per Rotation\s*=\s*([\d.]+\s*s)",
-
-            # Dose (com unidades)
-            'mean_ctdivol': r"Mean CTDIvol\s*=\s*([\d.]+\s*mGy)",
-            'phantom_type': r"CTDIw Phantom Type:\s*(.+)",
-            'dlp': r"DLP\s*=\s*([\d.]+\s*mGy\.cm)",
-            'specific_dose': r"Size Specific Dose Estimation\s*=\s*([\d.]+\s*mGy)",
-            'alert_value': r"CTDIvol Alert Value\s*=\s*([\d.]+\s*mGy)"
-        }
+    @cached_property
+    def essential_patterns(self) -> Dict[str, Tuple]:
+        return _compiled_patterns()[0]
+
+    @cached_property
+    def essential_regex_patterns(self) -> Tuple[Tuple[str, Tuple], ...]:
+        """(campo, padrão) dos essenciais que saem direto dos padrões, já na ordem do loop de extração"""
+        return tuple((field, self.essential_patterns[field]) for field in _ESSENTIAL_REGEX_FIELDS)
+
+    @cached_property
+    def technical_patterns(self) -> Dict[str, Tuple]:
+        return _compiled_patterns()[1]
+
+    @cached_property
+    def acquisition_pattern(self):
+        return _compiled_patterns()[2]
+
+    @cached_property
+    def acquisition_label_pattern(self):
+        return _compiled_patterns()[3]
 
     def clean_extracted_text(self, text: str) -> str:
         """
@@ -199,71 +570,70 @@ class CTReportExtractorMinimal:
         - Correção específica para horários (espaço após :)
 
         NÃO mexe com pontuação normal de números/unidades!
+
+        Equivale a normalize_text seguido de finish_value (a ordem entre juntar
+        espaços e corrigir horários não altera o resultado).
         """
         if not text:
             return ""
+        return self.finish_value(self.normalize_text(text))
 
-        cleaned = text
-
-        # Remove APENAS NNBSP e caracteres invisíveis
-        cleaned = cleaned.replace('\u00A0', ' ')  # Non-Breaking Space
-        cleaned = cleaned.replace('NNBSP', ' ')  # NNBSP literal (caso apareça assim)
-
-        # Remove outros espaços Unicode INVISÍVEIS (apenas os problemáticos)
-        cleaned = cleaned.replace('\u2000', ' ')  # En Quad
-        cleaned = cleaned.replace('\u2001', ' ')  # Em Quad
-        cleaned = cleaned.replace('\u2002', ' ')  # En Space
-        cleaned = cleaned.replace('\u2003', ' ')  # Em Space
-        cleaned = cleaned.replace('\u2009', ' ')  # Thin Space
-        cleaned = cleaned.replace('\u200A', ' ')  # Hair Space
-        cleaned = cleaned.replace('\u202F', ' ')  # Narrow No-Break Space
+    def normalize_text(self, text: str) -> str:
+        """
+        Parte da limpeza que preserva as linhas: caracteres invisíveis e espaços múltiplos.
 
-        # Remove zero-width characters (completamente invisíveis)
-        cleaned = cleaned.replace('\u200B', '')  # Zero Width Space
-        cleaned = cleaned.replace('\u200C', '')  # Zero Width Non-Joiner
-        cleaned = cleaned.replace('\u200D', '')  # Zero Width Joiner
-        cleaned = cleaned.replace('\uFEFF', '')  # Zero Width No-Break Space (BOM)
+        O extract_from_pdf aplica uma única vez no texto inteiro; os valores tirados
+        dele só precisam do finish_value.
+        """
+        # NNBSP literal (caso apareça assim)
+        cleaned = text.replace('NNBSP', ' ')
 
-        # ✨ CORREÇÃO ESPECÍFICA: Remove espaço extra após : em horários (ex: "2:40: 38" → "2:40:38")
-        # Mas APENAS em contexto de horário (números:números)
-        cleaned = re.sub(r'(\d+:\d+):\s+(\d+)', r'\1:\2', cleaned)
+        # Espaços Unicode invisíveis e zero-width em uma única passada (tabela _INVISIBLE_CHARS)
+        cleaned = cleaned.translate(_INVISIBLE_CHARS)
 
         # APENAS normaliza espaços múltiplos (não mexe com pontuação!)
-        cleaned = re.sub(r'  +', ' ', cleaned)  # Substitui 2+ espaços por 1 espaço
+        return _MULTI_SPACE_RE.sub(' ', cleaned)  # Substitui 2+ espaços por 1 espaço
 
-        return cleaned.strip()
+    def finish_value(self, value: str) -> str:
+        """Limpeza final de um valor tirado do texto já normalizado (normalize_text)"""
+        if not value:
+            return ""
+        return _finish_value(value)
 
     def extract_hospital_info(self, text: str) -> tuple:
         """Extrai informações do hospital e data do relatório"""
-        lines = text.split('\n')
+        # Só as 5 primeiras linhas interessam: o maxsplit evita quebrar o texto inteiro
+        lines = text.split('\n', 5)[:5]
         hospital = ""
         report_date = ""
 
-        for line in lines[:5]:
+        for line in lines:
             if "Hospital" in line and "on CT" in line:
                 parts = line.split("on CT,")
                 if len(parts) >= 2:
                     hospital = parts[0].replace("By ", "").strip()
-                    report_date = self.clean_extracted_text(parts[1].strip())
+                    report_date = self.finish_value(parts[1].strip())
                 break
 
         return hospital, report_date
 
-    def extract_patient_name(self, text: str) -> str:
-        """Extrai o nome do paciente usando PyMuPDF + Limpeza"""
+    def extract_patient_name(self, text: str, lines: Optional[List[str]] = None) -> str:
+        """Extrai o nome do paciente usando PyMuPDF + Limpeza (lines: linhas já quebradas do texto)"""
 
-        lines = text.split('\n')
+        if lines is None:
+            lines = text.split('\n')
         patient_name_parts = []
 
         for i, line in enumerate(lines):
             # Procura pela linha que contém "Patient's Name:"
             line_stripped = line.strip()
-            if re.search(r"Patient's\s*Name\s*:", line_stripped, re.IGNORECASE):
+            # O ':' é obrigatório no rótulo: filtra a maioria das linhas sem rodar o regex
+            if ':' in line_stripped and _PATIENT_NAME_LABEL_RE.search(line_stripped):
                 # Extrai o que vem depois de "Patient's Name:"
-                name_part = re.sub(r".*Patient's\s*Name\s*:\s*", "", line_stripped, flags=re.IGNORECASE).strip()
+                name_part = _PATIENT_NAME_PREFIX_RE.sub("", line_stripped).strip()
                 if name_part:
                     # ✨ LIMPA caracteres problemáticos
-                    name_part = self.clean_extracted_text(name_part)
+                    name_part = self.finish_value(name_part)
                     patient_name_parts.append(name_part)
 
                 # Com PyMuPDF, verifica as próximas linhas para capturar continuação do nome
@@ -280,13 +650,12 @@ class CTReportExtractorMinimal:
                         break
 
                     # Para se encontrar um campo conhecido do paciente
-                    known_fields = ['Patient ID', 'PatientID', 'Patient\'s Birth', 'Patient\'s Sex']
-                    if any(field in next_line for field in known_fields):
+                    if any(field in next_line for field in _PATIENT_FIELD_MARKERS):
                         break
 
                     # Se chegou até aqui, provavelmente é continuação do nome
                     # ✨ LIMPA caracteres problemáticos
-                    next_line_clean = self.clean_extracted_text(next_line)
+                    next_line_clean = self.finish_value(next_line)
                     patient_name_parts.append(next_line_clean)
                     j += 1
 
@@ -296,12 +665,12 @@ class CTReportExtractorMinimal:
         if patient_name_parts:
             full_name = ' '.join(patient_name_parts).strip()
             # Remove espaços duplos (redundante, mas garantia extra)
-            full_name = re.sub(r'\s+', ' ', full_name)
+            full_name = _WHITESPACE_RE.sub(' ', full_name)
             return full_name
 
         return ""
 
-    def extract_study_date_clean(self, text: str) -> str:
+    def extract_study_date_clean(self, text: str, lines: Optional[List[str]] = None) -> str:
         """
         ✨ MÉTODO MELHORADO: Extrai Study Date e limpa caracteres problemáticos
 
@@ -310,14 +679,17 @@ class CTReportExtractorMinimal:
         38 PM
 
         Ou com NNBSP: "May 13, 2025, 2:40:NNBSP38 PM"
+
+        lines: linhas já quebradas do texto (evita um novo split)
         """
 
-        lines = text.split('\n')
+        if lines is None:
+            lines = text.split('\n')
 
         for i, line in enumerate(lines):
-            if re.search(r'Study\s*Date\s*:', line, re.IGNORECASE):
+            if ':' in line and _STUDY_DATE_LABEL_RE.search(line):
                 # Pega o que vem depois de "Study Date:"
-                date_part = re.sub(r'.*Study\s*Date\s*:\s*', '', line, flags=re.IGNORECASE).strip()
+                date_part = _STUDY_DATE_PREFIX_RE.sub('', line).strip()
 
                 # Se a linha termina com ":" ou parece incompleta, pega a próxima linha também
                 if (date_part.endswith(':') or date_part.endswith(',')) and i + 1 < len(lines):
@@ -327,23 +699,23 @@ class CTReportExtractorMinimal:
 
                 if date_part:
                     # Limpa caracteres problemáticos
-                    date_part = self.clean_extracted_text(date_part)
+                    date_part = self.finish_value(date_part)
                     return date_part
 
         # Fallback para os padrões originais
         raw_date = self.extract_essential_value(text, self.essential_patterns['study_date'])
-        return self.clean_extracted_text(raw_date) if raw_date else ""
+        return self.finish_value(raw_date) if raw_date else ""
 
-    def extract_physical_location_multiline(self, text: str) -> str:
-        """Extrai physical location mesmo se quebrado em múltiplas linhas"""
+    def extract_physical_location_multiline(self, text: str, lines: Optional[List[str]] = None) -> str:
+        """Extrai physical location mesmo se quebrado em múltiplas linhas (lines: linhas já quebradas)"""
 
-        lines = text.split('\n')
+        if lines is None:
+            lines = text.split('\n')
 
         for i, line in enumerate(lines):
-            if re.search(r'Device Observer Physical Location during observation:', line, re.IGNORECASE):
+            if ':' in line and _LOCATION_LABEL_RE.search(line):
                 # Pega o que vem depois do campo
-                location_part = re.sub(r'.*Device Observer Physical Location during observation:\s*', '', line,
-                                       flags=re.IGNORECASE).strip()
+                location_part = _LOCATION_PREFIX_RE.sub('', line).strip()
 
                 # Se parece truncado (termina abruptamente sem pontuação) e existe próxima linha
                 if location_part and i + 1 < len(lines):
@@ -352,157 +724,249 @@ class CTReportExtractorMinimal:
                     # Se a próxima linha não é um campo numerado (1.10, 1.11, etc.)
                     # e não contém ":", provavelmente é continuação
                     if (next_line and
-                            not re.match(r'^\d+\.\d+', next_line) and  # Não começa com número.número
+                            not _NUMBERED_FIELD_RE.match(next_line) and  # Não começa com número.número
                             ':' not in next_line and  # Não é outro campo
                             len(next_line) < 50):  # Linha razoavelmente curta (continuação)
 
                         location_part = (location_part + ' ' + next_line).strip()
 
                 if location_part:
-                    return self.clean_extracted_text(location_part)
+                    return self.finish_value(location_part)
 
         # Fallback para o método original
         return self.extract_technical_value(text, self.technical_patterns['location'])
 
-    def extract_essential_value(self, text: str, pattern_list: List[str]) -> str:
-        """Tenta extrair valor usando múltiplos padrões até encontrar um"""
-        for pattern in pattern_list:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                # ✨ LIMPA o resultado antes de retornar
-                return self.clean_extracted_text(match.group(1))
+    def extract_essential_value(self, text: str, pattern: Tuple[Tuple[str, ...], re.Pattern],
+                                lowered_text: Optional[str] = None) -> str:
+        """
+        Extrai valor com a alternância dos múltiplos padrões do campo (uma única busca)
+
+        Com lowered_text (o texto em minúsculas, calculado uma vez por relatório),
+        pula a busca quando nenhum rótulo do campo aparece no texto.
+        """
+        literals, regex = pattern
+        if lowered_text is not None and not any(literal in lowered_text for literal in literals):
+            return ""
+        match = regex.search(text)
+        if match:
+            # O grupo que casou é o da alternativa encontrada
+            # ✨ LIMPA o resultado antes de retornar
+            return self.finish_value(match.group(match.lastindex))
         return ""
 
-    def extract_technical_value(self, text: str, pattern: str) -> str:
-        """Extrai um valor técnico usando regex"""
-        match = re.search(pattern, text, re.IGNORECASE)
+    def extract_technical_value(self, text: str, pattern: Tuple[str, re.Pattern]) -> str:
+        """Extrai um valor técnico usando regex pré-compilado, só se o rótulo literal estiver no texto"""
+        literal, regex = pattern
+        position = text.find(literal)
+        if position < 0:
+            return ""
+        # A busca começa na primeira ocorrência do rótulo (o re2 não tem a busca por prefixo do re)
+        match = regex.search(text, position)
         if match:
             # ✨ LIMPA o resultado antes de retornar
-            return self.clean_extracted_text(match.group(1))
+            return self.finish_value(match.group(1))
         return ""
 
+    def _search_acquisition_field(self, text: str, field: str, start: int, end: int) -> Optional[str]:
+        """Primeira ocorrência de um campo na seção text[start:end] (busca individual, sem o regex mestre)"""
+        literal, regex = self.technical_patterns[field]
+        position = text.find(literal, start, end)
+        while position >= 0:
+            match = regex.search(text, position, end)
+            if not match:
+                return None
+            # Mesmo critério da varredura: "Maximum X-Ray Tube Current" não é a corrente do tubo
+            if field == 'tube_current' and text.endswith('Maximum ', start, match.start()):
+                position = text.find(literal, match.start() + 1, end)
+                continue
+            return match.group(1)
+        return None
+
     def extract_ct_acquisitions(self, text: str) -> List[CTAcquisition]:
         """Extrai informações de aquisições CT"""
         acquisitions = []
 
-        # Divide o texto em seções de aquisição
-        acquisition_sections = re.split(r'\d+\.\d+\s+CT\s+Acquisition', text)
-
-        for section in acquisition_sections[1:]:
-            acquisition = CTAcquisition()
-
-            # Extrai informações básicas da aquisição
-            acquisition.protocol = self.extract_technical_value(section, self.technical_patterns['protocol'])
-            acquisition.target_region = self.extract_technical_value(section, self.technical_patterns['target_region'])
-            acquisition.acquisition_type = self.extract_technical_value(section,
-                                                                        self.technical_patterns['acquisition_type'])
-            acquisition.procedure_context = self.extract_technical_value(section,
-                                                                         self.technical_patterns['procedure_context'])
-            acquisition.irradiation_event_uid = self.extract_technical_value(section,
-                                                                             self.technical_patterns['irradiation_uid'])
-            acquisition.comment = self.extract_technical_value(section, self.technical_patterns['comment'])
-
-            # Extrai parâmetros de aquisição
-            params = CTAcquisitionParams()
-            params.exposure_time = self.extract_technical_value(section, self.technical_patterns['exposure_time'])
-            params.scanning_length = self.extract_technical_value(section, self.technical_patterns['scanning_length'])
-            params.nominal_single_collimation = self.extract_technical_value(section, self.technical_patterns[
-                'single_collimation'])
-            params.nominal_total_collimation = self.extract_technical_value(section, self.technical_patterns[
-                'total_collimation'])
-            params.num_xray_sources = self.extract_technical_value(section, self.technical_patterns['num_sources'])
-            params.pitch_factor = self.extract_technical_value(section, self.technical_patterns['pitch_factor']) or None
-            acquisition.acquisition_params = params
-
-            # Extrai parâmetros da fonte de raios-X
-            xray_params = XRaySourceParams()
-            xray_params.identification = self.extract_technical_value(section, self.technical_patterns['source_id'])
-            xray_params.kvp = self.extract_technical_value(section, self.technical_patterns['kvp'])
-            xray_params.max_tube_current = self.extract_technical_value(section, self.technical_patterns['max_current'])
-            xray_params.tube_current = self.extract_technical_value(section, self.technical_patterns['tube_current'])
-            xray_params.exposure_time_per_rotation = self.extract_technical_value(section, self.technical_patterns[
-                'rotation_time']) or None
-            acquisition.xray_source_params = xray_params
-
-            # Extrai informações de dose
-            dose = CTDose()
-            dose.mean_ctdivol = self.extract_technical_value(section, self.technical_patterns['mean_ctdivol'])
-            dose.phantom_type = self.extract_technical_value(section, self.technical_patterns['phantom_type'])
-            dose.dlp = self.extract_technical_value(section, self.technical_patterns['dlp'])
-            dose.size_specific_dose = self.extract_technical_value(section,
-                                                                   self.technical_patterns['specific_dose']) or None
-            dose.ctdivol_alert_value = self.extract_technical_value(section,
-                                                                    self.technical_patterns['alert_value']) or None
-            acquisition.ct_dose = dose
-
-            acquisitions.append(acquisition)
+        # Limites das seções de aquisição: cada uma vai do fim de um cabeçalho até o início do próximo.
+        # As buscas usam pos/endpos sobre o próprio texto, sem criar uma cópia de cada seção
+        headers = list(self.acquisition_split_pattern.finditer(text))
+        bounds = [(header.end(), next_header.start()) for header, next_header in zip(headers, headers[1:])]
+        if headers:
+            bounds.append((headers[-1].end(), len(text)))
+
+        label_search = self.acquisition_label_pattern.search
+        for start, end in bounds:
+            # Uma única passada pela seção: a primeira ocorrência de cada campo vence.
+            # lastgroup é o nome do campo; o grupo de captura original vem logo após o grupo nomeado
+            fields = {}
+            hidden_label = False
+            for match in self.acquisition_pattern.finditer(text, start, end):
+                value = match.group(match.lastindex + 1)
+                # Vale também para as ocorrências repetidas, que consomem o texto do mesmo jeito
+                if label_search(value):
+                    hidden_label = True
+                    break
+                field = match.lastgroup
+                if field in fields:
+                    continue
+                # "Maximum X-Ray Tube Current" é o max_current, não a corrente do tubo
+                if field == 'tube_current' and text.endswith('Maximum ', start, match.start()):
+                    continue
+                # ✨ LIMPA o resultado antes de guardar
+                fields[field] = self.finish_value(value)
+
+            # Algum rótulo ficou dentro de um valor: a primeira ocorrência daquele campo pode ter sido
+            # engolida, então a seção volta às buscas individuais (mesmo resultado das ~22 buscas separadas)
+            if hidden_label:
+                fields = {}
+                for field in _ACQUISITION_FIELDS:
+                    value = self._search_acquisition_field(text, field, start, end)
+                    if value is not None:
+                        fields[field] = self.finish_value(value)
+
+            # Só os campos encontrados (e não vazios) vão para os construtores; os que faltam ficam com o
+            # default do dataclass ("" nos obrigatórios, None nos opcionais como pitch_factor)
+            acquisitions.append(CTAcquisition(
+                **{name: fields[key] for name, key in _ACQUISITION_INFO_FIELDS if fields.get(key)},
+                acquisition_params=CTAcquisitionParams(
+                    **{name: fields[key] for name, key in _ACQUISITION_PARAM_FIELDS if fields.get(key)}),
+                xray_source_params=XRaySourceParams(
+                    **{name: fields[key] for name, key in _XRAY_SOURCE_FIELDS if fields.get(key)}),
+                ct_dose=CTDose(**{name: fields[key] for name, key in _CT_DOSE_FIELDS if fields.get(key)})
+            ))
 
         return acquisitions
 
     def extract_from_pdf(self, pdf_path: str, debug_mode: bool = False) -> CTScanReportMinimal:
-        """Extrai informações de um arquivo PDF - Versão Minimal"""
-        report = CTScanReportMinimal()
-        full_text = ""
-
-        doc = pymupdf.open(pdf_path)
-        for page in doc:
-            full_text += page.get_text() + "\n"
-        doc.close()
+        """
+        Extrai informações de um arquivo PDF - Versão Minimal
 
-        if debug_mode:
-            print(f"\n{'=' * 60}")
-            print("VERSÃO AGNÓSTICA - EXTRAINDO APENAS INFORMAÇÕES ESSENCIAIS")
-            print(f"{'=' * 60}")
+        debug_mode manda as mensagens de debug para o logger "CTDoseExtractor"; onde (e se) elas
+        aparecem fica com a configuração de logging de quem chama (a CLI usa _enable_debug_logging).
+        """
+        debug = debug_mode and logger.isEnabledFor(logging.DEBUG)
+
+        pymupdf, text_flags = _load_pymupdf()
+        with pymupdf.open(pdf_path) as doc:
+            # Olha só a primeira página antes: PDF escaneado (só imagem) ou que não é relatório
+            # de dose volta vazio sem ler as outras páginas nem rodar os padrões
+            first_page = doc[0].get_text(flags=text_flags) if len(doc) else ""
+            if not _looks_like_report(first_page):
+                # Aviso normal (não só no debug): sem ele o PDF pulado passaria por um relatório sem dados.
+                # Sem logging configurado, o Python mostra warnings no stderr
+                logger.warning(f"⚠️ Sem texto de relatório na primeira página, PDF ignorado: "
+                               f"{os.path.basename(pdf_path)}")
+                return CTScanReportMinimal()
+
+            # Junta as páginas de uma vez (evita recriar a string a cada += em PDFs com muitas páginas)
+            full_text = "".join([first_page + "\n"] +
+                                [doc[number].get_text(flags=text_flags) + "\n" for number in range(1, len(doc))])
+
+        # Limpa o texto inteiro uma única vez (sem mexer nas linhas); os valores só recebem o finish_value
+        full_text = self.normalize_text(full_text)
+
+        # Quebra o texto em linhas e gera a versão em minúsculas uma única vez (pré-filtros dos campos)
+        lines = full_text.split('\n')
+        lowered_text = full_text.lower()
 
         # Extrai informações do hospital
-        report.hospital, report.report_date = self.extract_hospital_info(full_text)
-
-        # Extrai TODOS os dados essenciais (incluindo o novo nome)
-        report.essential.patient_id = self.extract_essential_value(full_text, self.essential_patterns['patient_id'])
-        report.essential.patient_name = self.extract_patient_name(full_text)
-        report.essential.study_id = self.extract_essential_value(full_text, self.essential_patterns['study_id'])
-        report.essential.accession_number = self.extract_essential_value(full_text,
-                                                                         self.essential_patterns['accession_number'])
-        report.essential.study_date = self.extract_study_date_clean(full_text)
-        report.essential.birth_date = self.extract_essential_value(full_text, self.essential_patterns['birth_date'])
-        report.essential.sex = self.extract_essential_value(full_text, self.essential_patterns['sex'])
-
-        if debug_mode:
-            print("DADOS ESSENCIAIS EXTRAÍDOS:")
-            print(f"  Patient ID: '{report.essential.patient_id}'")
-            print(f"  Patient Name: '{report.essential.patient_name}'")
-            print(f"  Study ID: '{report.essential.study_id}'")
-            print(f"  Accession Number: '{report.essential.accession_number}'")
-            print(f"  Study Date: '{report.essential.study_date}'")
-            print(f"  Birth Date: '{report.essential.birth_date}'")
-            print(f"  Sex: '{report.essential.sex}'")
-            print(f"{'=' * 60}\n")
+        hospital, report_date = self.extract_hospital_info(full_text)
+
+        # Extrai TODOS os dados essenciais (incluindo o novo nome) em dicts; os dataclasses só no final
+        extract_essential = self.extract_essential_value
+        essential = {field: extract_essential(full_text, pattern, lowered_text)
+                     for field, pattern in self.essential_regex_patterns}
+        essential['patient_name'] = self.extract_patient_name(full_text, lines)
+        essential['study_date'] = self.extract_study_date_clean(full_text, lines)
+
+        # Só monta a mensagem quando o debug está ligado
+        if debug:
+            logger.debug("\n".join([
+                f"\n{'=' * 60}",
+                "VERSÃO AGNÓSTICA - EXTRAINDO APENAS INFORMAÇÕES ESSENCIAIS",
+                f"{'=' * 60}",
+                "DADOS ESSENCIAIS EXTRAÍDOS:",
+                f"  Patient ID: '{essential['patient_id']}'",
+                f"  Patient Name: '{essential['patient_name']}'",
+                f"  Study ID: '{essential['study_id']}'",
+                f"  Accession Number: '{essential['accession_number']}'",
+                f"  Study Date: '{essential['study_date']}'",
+                f"  Birth Date: '{essential['birth_date']}'",
+                f"  Sex: '{essential['sex']}'",
+                f"{'=' * 60}\n"
+            ]))
 
         # Extrai dados técnicos
-        report.device.observer_name = self.extract_technical_value(full_text, self.technical_patterns['device_name'])
-        report.device.manufacturer = self.extract_technical_value(full_text, self.technical_patterns['manufacturer'])
-        report.device.model_name = self.extract_technical_value(full_text, self.technical_patterns['model_name'])
-        report.device.serial_number = self.extract_technical_value(full_text, self.technical_patterns['serial_number'])
-        report.device.physical_location = self.extract_physical_location_multiline(full_text)
+        extract_technical = self.extract_technical_value
+        technical_patterns = self.technical_patterns
+        device = {field: extract_technical(full_text, technical_patterns[key]) for field, key in _DEVICE_FIELDS}
+        device['physical_location'] = self.extract_physical_location_multiline(full_text, lines)
 
         # Extrai informações de irradiação
-        report.irradiation.start_time = self.extract_technical_value(full_text,
-                                                                     self.technical_patterns['start_irradiation'])
-        report.irradiation.end_time = self.extract_technical_value(full_text,
-                                                                   self.technical_patterns['end_irradiation'])
-        report.irradiation.total_events = self.extract_technical_value(full_text,
-                                                                       self.technical_patterns['total_events'])
-        report.irradiation.total_dlp = self.extract_technical_value(full_text, self.technical_patterns['total_dlp'])
+        irradiation = {field: extract_technical(full_text, technical_patterns[key])
+                       for field, key in _IRRADIATION_FIELDS}
+
+        return CTScanReportMinimal(
+            hospital=hospital,
+            report_date=report_date,
+            essential=EssentialInfo(**essential),
+            device=DeviceInfo(**device),
+            irradiation=IrradiationInfo(**irradiation),
+            # Extrai aquisições CT
+            acquisitions=self.extract_ct_acquisitions(full_text)
+        )
+
+
+@lru_cache(maxsize=None)
+def _get_extractor() -> CTReportExtractorMinimal:
+    """Um único extrator por processo, reaproveitado entre os PDFs"""
+    return CTReportExtractorMinimal()
+
+
+def _extract_one(pdf_file: str, debug_mode: bool = False):
+    """
+    Extrai um PDF e devolve (relatório como dict, JSON do relatório, erro).
+
+    Fica no nível do módulo para poder ser enviado aos processos do pool;
+    o erro volta como texto para não interromper o map dos demais PDFs.
+    O JSON (já indentado como item de lista) também é gerado aqui, então
+    com o pool a serialização roda em paralelo junto com a extração.
+    """
+    try:
+        if debug_mode and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"\n{'=' * 60}\nPROCESSANDO: {os.path.basename(pdf_file)}\n{'=' * 60}")
 
-        # Extrai aquisições CT
-        report.acquisitions = self.extract_ct_acquisitions(full_text)
+        report_dict = _get_extractor().extract_from_pdf(pdf_file, debug_mode=debug_mode).to_dict()
+
+        # "[\n" + item + "\n]" é exatamente o JSON de [report_dict]
+        return report_dict, _serialize_reports([report_dict])[2:-2], None
+    except Exception as e:
+        return None, None, str(e)
 
-        return report
+
+def _iter_extracted(pdf_files: List[str], debug_mode: bool, workers: int):
+    """Extrai os PDFs em ordem; com workers > 1 usa um pool de processos"""
+    if workers > 1:
+        # Com o --debug da CLI, liga o mesmo logging em cada worker (no spawn a configuração do pai
+        # não é herdada); a configuração de um chamador da biblioteca não é tocada
+        initializer = _enable_debug_logging if debug_mode and _debug_handler is not None else None
+        with ProcessPoolExecutor(max_workers=workers, initializer=initializer) as executor:
+            yield from executor.map(_extract_one, pdf_files, [debug_mode] * len(pdf_files), chunksize=4)
+    else:
+        for pdf_file in pdf_files:
+            yield _extract_one(pdf_file, debug_mode)
 
 
 def process_pdf_folder(folder_path: str = "ct_reports", json_folder: str = "ct_reports_json",
-                       debug_mode: bool = False) -> List[Dict]:
-    """Processa todos os arquivos PDF em uma pasta específica"""
+                       debug_mode: bool = False, workers: int = 1, output_file: Optional[str] = None) -> List[Dict]:
+    """
+    Processa todos os arquivos PDF em uma pasta específica
+
+    Com workers > 1, a extração dos PDFs é feita em paralelo por um pool de
+    processos, que também serializam cada relatório (a gravação dos JSONs continua no
+    processo principal, na ordem dos arquivos).
+    Com output_file, grava também o JSON com todos os relatórios, reaproveitando o
+    JSON já serializado de cada um (cada relatório é serializado uma única vez).
+    """
 
     # Cria a pasta se não existir
     if not os.path.exists(folder_path):
@@ -513,9 +977,13 @@ def process_pdf_folder(folder_path: str = "ct_reports", json_folder: str = "ct_r
             print(f"✗ Erro ao criar pasta '{folder_path}': {str(e)}")
             return []
 
-    # Busca todos os arquivos PDF na pasta (compatível com Windows, Mac e Linux)
-    pdf_pattern = os.path.join(folder_path, "*.pdf")
-    pdf_files = glob.glob(pdf_pattern)
+    # Busca todos os arquivos PDF na pasta (compatível com Windows, Mac e Linux).
+    # O scandir já traz nome e caminho de cada entrada; como no glob, ocultos ficam de fora
+    # e o normcase deixa a extensão sem distinção de maiúsculas no Windows
+    with os.scandir(folder_path) as entries:
+        pdf_files = [entry.path for entry in entries
+                     if os.path.normcase(entry.name).endswith('.pdf')
+                     and not entry.name.startswith('.') and entry.is_file()]
 
     if not pdf_files:
         print(f"ℹ️ Nenhum arquivo PDF encontrado na pasta '{folder_path}'.")
@@ -523,60 +991,76 @@ def process_pdf_folder(folder_path: str = "ct_reports", json_folder: str = "ct_r
 
     print(f"🔍 Encontrados {len(pdf_files)} arquivos PDF para processar.")
 
+    # Garante a pasta dos JSONs uma única vez (os saves abaixo não verificam de novo)
+    json_folder = _ensure_json_folder(json_folder)
+
     # Processa os PDFs encontrados
-    extractor = CTReportExtractorMinimal()
     reports = []
-
-    for pdf_file in pdf_files:
-        try:
-            if debug_mode:
-                print(f"\n{'=' * 60}")
-                print(f"PROCESSANDO: {os.path.basename(pdf_file)}")
-                print(f"{'=' * 60}")
-
-            report = extractor.extract_from_pdf(pdf_file, debug_mode=debug_mode)
-            report_dict = asdict(report)
-            reports.append(report_dict)
-
-            # Salva o relatório individual usando o Patient ID
-            patient_id = report.essential.patient_id
-            if patient_id:
-                output_file = f"ct_report_{patient_id}.json"
-                save_to_json([report_dict], output_file, json_folder)
-                print(f"✓ Processado e salvo: {os.path.basename(pdf_file)} → {os.path.join(json_folder, output_file)}")
-            else:
-                print(f"✓ Processado: {os.path.basename(pdf_file)} (sem Patient ID)")
-
-        except Exception as e:
-            print(f"✗ Erro ao processar {os.path.basename(pdf_file)}: {str(e)}")
+    report_items = []  # JSON de cada relatório já indentado como item de lista
+
+    for pdf_file, (report_dict, item, error) in zip(pdf_files, _iter_extracted(pdf_files, debug_mode, workers)):
+        pdf_name = os.path.basename(pdf_file)
+        if error is not None:
+            print(f"✗ Erro ao processar {pdf_name}: {error}")
+            continue
+
+        reports.append(report_dict)
+        report_items.append(item)
+
+        # Salva o relatório individual usando o Patient ID
+        patient_id = report_dict['essential']['patient_id']
+        if patient_id:
+            report_file = f"ct_report_{patient_id}.json"
+            _save_json_bytes(b"[\n" + item + b"\n]", report_file, json_folder)
+            report_path = os.path.join(json_folder, report_file) if json_folder else report_file
+            print(f"✓ Processado e salvo: {pdf_name} → {report_path}")
+        else:
+            print(f"✓ Processado: {pdf_name} (sem Patient ID)")
+
+    # JSON com todos os relatórios, montado a partir dos itens já serializados
+    if output_file and report_items:
+        _save_json_bytes(b"[\n" + b",\n".join(report_items) + b"\n]", output_file, json_folder)
 
     return reports
 
 
-def save_to_json(reports: List[Dict], output_file: str, json_folder: str = "ct_reports_json"):
-    """Salva os relatórios em um arquivo JSON"""
-    # Cria a pasta JSON se não existir
+def _ensure_json_folder(json_folder: str) -> str:
+    """Cria a pasta JSON se não existir; se não der, devolve "" (salva na pasta atual)"""
     if not os.path.exists(json_folder):
         try:
             os.makedirs(json_folder)
             print(f"✓ Pasta '{json_folder}' criada com sucesso!")
         except Exception as e:
             print(f"⚠️ Erro ao criar pasta '{json_folder}': {str(e)}")
-            json_folder = ""
+            return ""
+    return json_folder
+
+
+def _serialize_reports(reports: List[Dict]) -> bytes:
+    """JSON indentado com 2 espaços, em UTF-8 sem escapes (orjson quando instalado)"""
+    if orjson is not None:
+        return orjson.dumps(reports, option=orjson.OPT_INDENT_2)
+    return json.dumps(reports, indent=2, ensure_ascii=False).encode('utf-8')
 
-    # Caminho completo para o arquivo
-    output_path = os.path.join(json_folder, output_file) if json_folder else output_file
 
-    # Salva o JSON
+def _save_json_bytes(data: bytes, output_file: str, json_folder: str) -> bool:
+    """Grava um JSON já serializado na pasta (que já deve existir; "" = pasta atual)"""
+    output_path = os.path.join(json_folder, output_file) if json_folder else output_file
     try:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(reports, f, indent=2, ensure_ascii=False)
+        with open(output_path, 'wb') as f:
+            f.write(data)
         return True
     except Exception as e:
         print(f"⚠️ Erro ao salvar {output_path}: {str(e)}")
         return False
 
 
+def save_to_json(reports: List[Dict], output_file: str, json_folder: str = "ct_reports_json"):
+    """Salva os relatórios em um arquivo JSON"""
+    json_folder = _ensure_json_folder(json_folder)
+    return _save_json_bytes(_serialize_reports(reports), output_file, json_folder)
+
+
 if __name__ == "__main__":
     import argparse
 
@@ -590,8 +1074,12 @@ if __name__ == "__main__":
                         help='Ativa o modo debug com informações detalhadas')
     parser.add_argument('--output', type=str, default='ct_reports_all.json',
                         help='Nome do arquivo JSON de saída com todos os relatórios (padrão: ct_reports_all.json)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processos para extrair os PDFs em paralelo (padrão: 1, sem paralelismo)')
 
     args = parser.parse_args()
+    if args.debug:
+        _enable_debug_logging()
 
     print(f"\n{'=' * 80}")
     print("CTDoseExtractor - Extrator de Relatórios de Dose de CT")
@@ -602,15 +1090,13 @@ if __name__ == "__main__":
     print(f"Arquivo de saída completo: {os.path.join(args.output_folder, args.output)}")
     print(f"{'=' * 80}\n")
 
-    # Processa a pasta de PDFs
-    reports_array = process_pdf_folder(args.folder, args.output_folder, debug_mode=args.debug)
+    # Processa a pasta de PDFs (e salva todos os resultados em um único JSON)
+    reports_array = process_pdf_folder(args.folder, args.output_folder, debug_mode=args.debug,
+                                       workers=args.workers, output_file=args.output)
 
     if not reports_array:
         print("⚠️ Nenhum relatório processado. Verifique a pasta com os arquivos PDF.")
         exit(0)
-
-    # Salva todos os resultados em um único JSON
-    save_to_json(reports_array, args.output, args.output_folder)
     print(f"\n✅ Processamento concluído!")
     print(f"  • Total de relatórios processados: {len(reports_array)}")
     print(f"  • Arquivo com todos os relatórios: {os.path.join(args.output_folder, args.output)}")